@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+import anyio
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from storage import load_windows, Window
+from storage import WINDOWS_PATH, load_windows, Window
 
 app = FastAPI(title="NetMon API")
 
@@ -18,24 +20,144 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Serialized responses, rebuilt only when windows.json changes on disk
+_cache: Dict = {
+    "version": None,
+    "windows": None,
+    "windows_etag": None,
+    "latest": None,
+    "latest_etag": None,
+    "summary": None,
+    "dashboard": None,
+}
+
+
+def _dumps(obj) -> bytes:
+    # Same encoding as JSONResponse, which refuses NaN/inf rather than emit invalid JSON
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _summarise(windows: List[Window]) -> Dict:
+    """Dashboard totals across all stored windows."""
+    total_flows = 0
+    total_packets = 0
+    benign_flows = 0
+    attack_flows = 0
+    label_totals: Dict[str, int] = {}
+
+    for w in windows:
+        m = w.metrics
+        total_flows += m.total_flows
+        total_packets += m.total_packets
+        benign_flows += m.benign_flows
+        attack_flows += m.attack_flows
+        for label, count in m.attacks_per_label.items():
+            label_totals[label] = label_totals.get(label, 0) + count
+
+    attack_percent = 100.0 * attack_flows / total_flows if total_flows else 0.0
+    return {
+        "window_count": len(windows),
+        "total_flows": total_flows,
+        "total_packets": total_packets,
+        "benign_flows": benign_flows,
+        "attack_flows": attack_flows,
+        "attack_percent": attack_percent,
+        "attacks_per_label": dict(sorted(label_totals.items(), key=lambda kv: kv[1], reverse=True)),
+    }
+
+
+def _windows_version() -> Optional[Tuple[int, int]]:
+    try:
+        st = WINDOWS_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+async def _get_cache() -> Dict:
+    version = _windows_version()
+    if _cache["windows"] is not None and version == _cache["version"]:
+        return _cache
+
+    windows: List[Window] = await anyio.to_thread.run_sync(load_windows)
+    _cache["windows"] = _dumps([w.to_dict() for w in windows])
+    _cache["windows_etag"] = 'W/"%x-%x"' % version if version else None
+    _cache["summary"] = _dumps(_summarise(windows))
+    # Both parts of the dashboard payload come from the same load, so the
+    # totals always match the table; spliced from the bytes above
+    _cache["dashboard"] = b'{"windows":' + _cache["windows"] + b',"summary":' + _cache["summary"] + b"}"
+    if windows:
+        # load_windows() returns windows ordered by start time
+        latest = windows[-1]
+        _cache["latest"] = _dumps(latest.to_dict())
+        # Windows are immutable once written, so id + end time identifies the body
+        _cache["latest_etag"] = f'"{latest.id}-{int(latest.metrics.end_time.timestamp())}"'
+    else:
+        _cache["latest"] = None
+        _cache["latest_etag"] = None
+    _cache["version"] = version
+    return _cache
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match check using weak comparison (RFC 9110 13.1.2): the header
+    may list several tags or be '*', and proxies may have weakened ours to W/.
+    """
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _json_response(request: Request, body: bytes, etag: Optional[str]) -> Response:
+    """Serve a cached JSON body, answering 304 when the client already has it."""
+    if etag is None:
+        return Response(content=body, media_type="application/json")
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @app.get("/api/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 @app.get("/api/windows")
-def get_windows():
-    windows: List[Window] = load_windows()
-    return [w.to_dict() for w in windows]
+async def get_windows(request: Request):
+    cache = await _get_cache()
+    return _json_response(request, cache["windows"], cache["windows_etag"])
+
+
+@app.get("/api/summary")
+async def get_summary(request: Request):
+    cache = await _get_cache()
+    return _json_response(request, cache["summary"], cache["windows_etag"])
+
+
+@app.get("/api/dashboard")
+async def get_dashboard(request: Request):
+    """Windows and summary in one response, for the dashboard's poll."""
+    cache = await _get_cache()
+    return _json_response(request, cache["dashboard"], cache["windows_etag"])
 
 
 @app.get("/api/windows/latest")
-def get_latest_window():
-    windows: List[Window] = load_windows()
-    if not windows:
+async def get_latest_window(request: Request):
+    cache = await _get_cache()
+    if cache["latest"] is None:
         raise HTTPException(status_code=404, detail="No windows available")
 
-    latest = max(windows, key=lambda w: w.metrics.start_time)
-    return latest.to_dict()
-
+    return _json_response(request, cache["latest"], cache["latest_etag"])
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Iterable, List, Optional, Sequence
 
-import joblib
+import numpy as np
 
 # Where the trained model is stored
 MODEL_PATH = Path("/opt/netmon/model/netmon_rf.joblib")
@@ -11,6 +11,10 @@ MODEL_PATH = Path("/opt/netmon/model/netmon_rf.joblib")
 # Probability threshold for accepting the top class
 ML_THRESHOLD = 0.90
 
+# Default threads for predict_proba (-1 = all cores). The worker passes a
+# smaller count while NTLFlowLyzer conversions are running.
+ML_N_JOBS = -1
+
 # Features (columns in NTLFlowLyzer CSV) used by the model.
 # Replace this list with the actual 20 features you select later.
 FEATURE_COLUMNS = [
@@ -38,22 +42,27 @@ FEATURE_COLUMNS = [
 
 # How to treat different raw labels coming from the model
 BENIGN_LABEL_CANONICAL = "Benign"
+_BENIGN_RAW_LABELS = frozenset({"benign", "normal", "background"})
 
 
 def _normalize_label(raw: str) -> str:
     s = raw.strip()
-    if s.lower() in {"benign", "normal", "background"}:
+    if s.lower() in _BENIGN_RAW_LABELS:
         return BENIGN_LABEL_CANONICAL
     return s
 
 
 _model = None
 _model_loaded = False
+# joblib.parallel_config, imported together with joblib at load
+_parallel_config = None
+# Normalized label for each entry of _model.classes_, built once at load
+_class_labels: Optional[np.ndarray] = None
 
 
 def _load_model():
     """Lazy-load the model once."""
-    global _model, _model_loaded
+    global _model, _model_loaded, _class_labels, _parallel_config
     if _model_loaded:
         return _model
 
@@ -64,8 +73,15 @@ def _load_model():
         return None
 
     try:
+        # Imported here so processes that never classify (API, pcap-only runs)
+        # don't pay for joblib
+        import joblib
+        from joblib import parallel_config
+
+        _parallel_config = parallel_config
         print(f"[ml_model] Loading model from {MODEL_PATH}")
         _model = joblib.load(MODEL_PATH)
+        _class_labels = np.array([_normalize_label(str(c)) for c in _model.classes_], dtype=object)
     except Exception as e:
         print(f"[ml_model] Failed to load model: {e}")
         _model = None
@@ -77,42 +93,104 @@ def model_is_ready() -> bool:
     return _load_model() is not None
 
 
-def classify_row(row: Dict[str, str]) -> Optional[str]:
+def classify_batch(X: Sequence[Sequence[float]], n_jobs: Optional[int] = None) -> Optional[np.ndarray]:
     """
-    Classify a single CSV row (one flow).
+    Classify a 2-D feature matrix (one row per flow, columns in
+    FEATURE_COLUMNS order) with a single predict_proba call, spread over
+    n_jobs threads (ML_N_JOBS if None).
 
-    Returns:
+    Returns an object array with one label per row, or None if model not ready:
       - 'Benign' (canonical benign label),
-      - 'Unknown' (probability < ML_THRESHOLD),
-      - <attack label string>,
-      - or None if model not ready / row unusable.
+      - 'Unknown' (probability < ML_THRESHOLD, or a row that can't be predicted),
+      - <attack label string>.
     """
     model = _load_model()
     if model is None:
         return None
 
+    n = len(X)
+    if n == 0:
+        return np.empty(0, dtype=object)
+
     try:
-        x = []
-        for col in FEATURE_COLUMNS:
-            val = row.get(col)
-            if val is None or val == "":
-                x.append(0.0)
-            else:
-                x.append(float(val))
-        # scikit-learn: predict_proba returns [n_samples, n_classes]
-        probs = model.predict_proba([x])[0]
-        # Pure Python argmax
-        max_idx = max(range(len(probs)), key=lambda i: probs[i])
-        max_prob = float(probs[max_idx])
-        raw_label = str(model.classes_[max_idx])
-
-        if max_prob < ML_THRESHOLD:
-            return "Unknown"
-
-        label = _normalize_label(raw_label)
-        return label
+        # Trees compare float32 thresholds, so float32 input avoids an internal copy.
+        # Values beyond float32 range become inf here and are caught by the
+        # finite check below like any other unparsable row.
+        with np.errstate(over="ignore"):
+            X = np.asarray(X, dtype=np.float32)
+        labels = np.full(n, "Unknown", dtype=object)
+        # predict_proba rejects NaN/inf for the whole call; leave just those
+        # rows 'Unknown' and predict the rest
+        finite = np.isfinite(X).all(axis=1)
+        if not finite.any():
+            return labels
+        # Idle keep-alives and scans repeat the same feature vector many times;
+        # predict each distinct vector once and fan the result back out.
+        uniq, inverse = np.unique(X[finite], axis=0, return_inverse=True)
+
+        # Spread the per-tree work over threads; tree prediction releases the GIL.
+        # (Estimators saved with their own n_jobs keep it.)
+        with _parallel_config(backend="threading", n_jobs=n_jobs or ML_N_JOBS):
+            probs = model.predict_proba(uniq)
+        max_idx = probs.argmax(axis=1)
+        max_prob = probs[np.arange(len(uniq)), max_idx]
+
+        uniq_labels = _class_labels[max_idx]
+        uniq_labels[max_prob < ML_THRESHOLD] = "Unknown"
+        labels[finite] = uniq_labels[inverse.reshape(-1)]
+        return labels
     except Exception as e:
         # Treat classification errors as "Unknown but suspicious"
-        print(f"[ml_model] classify_row error: {e}")
-        return "Unknown"
+        print(f"[ml_model] classify_batch error: {e}")
+        return np.full(n, "Unknown", dtype=object)
+
+
+def feature_indices(header: Sequence[str]) -> List[Optional[int]]:
+    """Position of each FEATURE_COLUMNS entry in a CSV header (None if absent)."""
+    pos = {name: i for i, name in enumerate(header)}
+    return [pos.get(col) for col in FEATURE_COLUMNS]
+
+
+def _record_vector(record: Sequence[str], indices: Sequence[Optional[int]]) -> List[float]:
+    """
+    Model input for one csv.reader record, using feature_indices() positions;
+    missing/empty values become 0.0.
+    """
+    n = len(record)
+    x = []
+    for i in indices:
+        val = record[i] if i is not None and i < n else ""
+        x.append(float(val) if val else 0.0)
+    return x
+
+
+def classify_records(
+    records: Iterable[Sequence[str]],
+    indices: Sequence[Optional[int]],
+    n_jobs: Optional[int] = None,
+) -> Optional[np.ndarray]:
+    """
+    Classify csv.reader records (one flow each) as a batch; indices comes
+    from feature_indices(header) so no per-row dict is needed.
+
+    Returns one label per record (see classify_batch), or None if model not
+    ready. Records whose features cannot be parsed are labelled 'Unknown'
+    without failing the rest of the batch.
+    """
+    if _load_model() is None:
+        return None
 
+    X = []
+    bad_rows = []
+    for i, record in enumerate(records):
+        try:
+            X.append(_record_vector(record, indices))
+        except ValueError as e:
+            print(f"[ml_model] classify_records error on row {i}: {e}")
+            X.append([0.0] * len(FEATURE_COLUMNS))
+            bad_rows.append(i)
+
+    labels = classify_batch(X, n_jobs)
+    if bad_rows:
+        labels[bad_rows] = "Unknown"
+    return labels
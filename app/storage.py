@@ -1,23 +1,33 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass, asdict
+import os
+from dataclasses import dataclass, asdict, field
 from datetime import datetime, timezone
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List
-
+from typing import Dict, List, Optional, Tuple
 
 WINDOWS_PATH = Path("/var/netmon/windows.json")
 
+# Set once the parent directory of WINDOWS_PATH is known to exist
+_windows_dir_ready = False
+
+
+def _iso_z(dt: datetime) -> str:
+    # isoformat() of a UTC datetime always ends in "+00:00"; swap it for "Z"
+    return dt.replace(tzinfo=timezone.utc).isoformat()[:-6] + "Z"
 
-@dataclass
+
+@dataclass(slots=True)
 class FeatureStats:
     mean: float
     min: float
     max: float
 
 
-@dataclass
+@dataclass(slots=True)
 class WindowMetrics:
     start_time: datetime
     end_time: datetime
@@ -31,18 +41,26 @@ class WindowMetrics:
     unknown_flows: int = 0  # NEW field for ML "Unknown / Need investigation" flows
 
 
-@dataclass
+@dataclass(slots=True)
 class Window:
     id: str
     metrics: WindowMetrics
     llm_summary: str
+    # Windows are never modified after creation, so the wire form is built once
+    _dict: Optional[Dict] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self) -> Dict:
+        """Serializable form of the window. Cached; treat the result as read-only."""
+        if self._dict is None:
+            self._dict = self._build_dict()
+        return self._dict
+
+    def _build_dict(self) -> Dict:
         return {
             "id": self.id,
             "metrics": {
-                "start_time": self.metrics.start_time.replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z"),
-                "end_time": self.metrics.end_time.replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z"),
+                "start_time": _iso_z(self.metrics.start_time),
+                "end_time": _iso_z(self.metrics.end_time),
                 "total_flows": self.metrics.total_flows,
                 "total_packets": self.metrics.total_packets,
                 "benign_flows": self.metrics.benign_flows,
@@ -86,14 +104,26 @@ def _metrics_from_dict(d: Dict) -> WindowMetrics:
 
 
 def load_windows() -> List[Window]:
-    if not WINDOWS_PATH.exists():
+    """
+    Load windows.json ordered by start time, re-parsing only when the file
+    changed on disk.
+    """
+    try:
+        st = WINDOWS_PATH.stat()
+    except FileNotFoundError:
         return []
+    return list(_load_windows_cached(str(WINDOWS_PATH), st.st_mtime_ns, st.st_size))
+
+
+@lru_cache(maxsize=1)
+def _load_windows_cached(path: str, mtime_ns: int, size: int) -> Tuple[Window, ...]:
     try:
-        with WINDOWS_PATH.open("r") as f:
-            raw = json.load(f)
+        raw = json.loads(Path(path).read_bytes())
+    except FileNotFoundError:
+        return ()
     except Exception as e:
         print(f"[storage] Failed to load windows.json: {e}")
-        return []
+        return ()
 
     windows: List[Window] = []
     for item in raw:
@@ -110,12 +140,19 @@ def load_windows() -> List[Window]:
             print(f"[storage] Failed to parse window item: {e}")
             continue
 
-    return windows
+    windows.sort(key=attrgetter("metrics.start_time"))
+    return tuple(windows)
 
 
 def save_windows(windows: List[Window]) -> None:
-    WINDOWS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    global _windows_dir_ready
+    if not _windows_dir_ready:
+        WINDOWS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _windows_dir_ready = True
     data = [w.to_dict() for w in windows]
-    with WINDOWS_PATH.open("w") as f:
-        json.dump(data, f, indent=2)
+    # Write a sibling file and rename it over windows.json, so the API never
+    # reads a half-written file and a crash mid-write keeps the old one
+    tmp_path = WINDOWS_PATH.with_name(WINDOWS_PATH.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, WINDOWS_PATH)
 
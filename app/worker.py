@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 import csv
+import hashlib
 import json
+import math
+import os
+import threading
 import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import asdict
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Optional
 
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from storage import Window, WindowMetrics, FeatureStats, load_windows, save_windows
-from ml_model import model_is_ready, classify_row
+from ml_model import model_is_ready, classify_records, feature_indices
 
 # Directories
 PCAP_DIR = Path("/var/pcaps")
@@ -19,10 +30,57 @@ CSV_DIR = Path("/var/netmon/flows")
 
 # NTLFlowLyzer binary
 NTL_BIN = "/opt/netmon/env/bin/ntlflowlyzer"
+# Threads NTLFlowLyzer uses per pcap, and how many pcaps are converted at once
+NTL_THREADS = 4
+PCAP_WORKERS = max(1, (os.cpu_count() or 1) // NTL_THREADS)
+# predict_proba threads while NTLFlowLyzer runs are in flight on the pcap thread:
+# the cores they leave over. With no conversion running, predict uses every core.
+ML_N_JOBS_WHILE_CONVERTING = max(1, (os.cpu_count() or 1) - PCAP_WORKERS * NTL_THREADS)
+
+# NTLFlowLyzer settings shared by every run; only the file paths vary per pcap
+_NTL_CONFIG_TEMPLATE: Dict[str, object] = {
+    "label": "Unknown",
+    "number_of_threads": NTL_THREADS,
+    "feature_extractor_min_flows": 1,
+    "writer_min_rows": 1,
+    "max_rows_number": 800000,
+}
 
 # Ollama settings
 OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
 OLLAMA_MODEL = "smollm2:135m"
+# Fixed instructions first and the window summary last, so every request
+# shares the same prompt prefix
+PROMPT_TEMPLATE = (
+    "You are a senior network security engineer writing notes for an internal monitoring dashboard.\n"
+    "Rewrite this summary of one 5-minute window of network traffic as 3–5 concise, professional "
+    "bullet points. Output only the bullet points, each starting with '- ', with no title, preamble, "
+    "quotes or code fences.\n\n"
+    "{summary}"
+)
+# A 3-5 bullet rewrite needs a small context and few output tokens
+OLLAMA_OPTIONS = {"num_predict": 256, "temperature": 0.2, "num_ctx": 1024}
+# Overall limit for one streamed summary (the request timeout only bounds the
+# gap between chunks), so a slow model can't stall the summaries queued behind it
+OLLAMA_TIMEOUT_SECONDS = 60
+
+# Shared HTTP session so consecutive summaries reuse the Ollama connection.
+# Only connection failures are retried (e.g. Ollama restarting); a slow
+# generation is never re-sent.
+_ollama_session = requests.Session()
+_ollama_session.mount(
+    "http://",
+    HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=1,
+        max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5),
+    ),
+)
+
+# LLM summaries already generated, keyed by a hash of the window metrics, so a
+# restarted worker doesn't ask Ollama again for the same window
+LLM_CACHE_PATH = Path("/var/netmon/llm_cache.json")
+LLM_CACHE_MAX_ENTRIES = 128
 
 # Keep only this many recent windows
 MAX_WINDOWS = 12
@@ -45,101 +103,259 @@ FEATURE_COLUMN_ALIASES: Dict[str, List[str]] = {
 
 FEATURES_OF_INTEREST: List[str] = list(FEATURE_COLUMN_ALIASES.keys())
 
+# Flows sent to the model per predict call
+ML_BATCH_SIZE = 4096
+
+_dirs_ready = False
+
+# Window ids already handled by this process, so later scans skip them
+# without touching the filesystem again
+_converted_pcaps: Set[str] = set()
+_summarised_csvs: Set[str] = set()
+
+_llm_cache: Optional[OrderedDict] = None
 
+# Set by the PCAP->CSV thread whenever a new CSV lands, to wake the summariser
+_csv_ready = threading.Event()
+# Set while process_pcaps_to_csv has NTLFlowLyzer runs in flight
+_converting = threading.Event()
+
+
+def _ensure_dirs() -> None:
+    """Create PCAP_DIR and CSV_DIR once per process."""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    PCAP_DIR.mkdir(parents=True, exist_ok=True)
+    CSV_DIR.mkdir(parents=True, exist_ok=True)
+    _dirs_ready = True
+
+
+def _scan_window_files(directory: Path, suffix: str) -> Dict[str, os.DirEntry]:
+    """window-*<suffix> entries in directory, keyed by window id in name order."""
+    with os.scandir(directory) as it:
+        entries = [e for e in it if e.name.startswith("window-") and e.name.endswith(suffix)]
+    entries.sort(key=lambda e: e.name)
+    return {e.name[: -len(suffix)]: e for e in entries}
+
+
+@lru_cache(maxsize=1024)
 def parse_window_times(window_id: str) -> Tuple[datetime, datetime]:
     """
     window_id is like 'window-20251208115026'.
     We treat that as the start of the 5-minute window in UTC.
     """
+    # Fixed-width YYYYmmddHHMMSS, so slice it rather than going through strptime
     ts_str = window_id.replace("window-", "")
-    dt = datetime.strptime(ts_str, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+    if len(ts_str) != 14 or not ts_str.isdigit():
+        raise ValueError(f"Bad window id: {window_id!r}")
+    dt = datetime(
+        int(ts_str[0:4]), int(ts_str[4:6]), int(ts_str[6:8]),
+        int(ts_str[8:10]), int(ts_str[10:12]), int(ts_str[12:14]),
+        tzinfo=timezone.utc,
+    )
     return dt, dt + timedelta(minutes=5)
 
 
-def _get_numeric_from_row(row: Dict[str, str], aliases: List[str]) -> Optional[float]:
+def _resolve_feature_columns(header: List[str]) -> Dict[str, Tuple[int, ...]]:
     """
-    Try all alias column names for a feature and return the first valid numeric value.
-    If nothing is found or cannot be parsed, returns None.
+    Map each canonical feature to the indices of its alias columns present in
+    this CSV header, in alias order. Features with no matching column are left out.
     """
-    for col in aliases:
-        if col in row and row[col] not in ("", None):
-            try:
-                return float(row[col])
-            except ValueError:
-                continue
-    return None
+    pos = {name: i for i, name in enumerate(header)}
+    resolved: Dict[str, Tuple[int, ...]] = {}
+    for canonical_name, aliases in FEATURE_COLUMN_ALIASES.items():
+        indices = tuple(pos[col] for col in aliases if col in pos)
+        if indices:
+            resolved[canonical_name] = indices
+    return resolved
+
+
+class _RunningStats:
+    """Count / sum / min / max of one feature column, without keeping the values."""
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        self.total += x
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+
+class _CountStats(_RunningStats):
+    """_RunningStats that also sums int(value) per row, for the packet/byte totals."""
+
+    __slots__ = ("int_total",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.int_total = 0
+
+    def add(self, x: float) -> None:
+        super().add(x)
+        if math.isfinite(x):
+            self.int_total += int(x)
+
+
+def _accumulate_stats(
+    rows: Iterable[List[str]], columns: List[Tuple[Tuple[int, ...], _RunningStats]]
+) -> int:
+    """
+    Feed each CSV record's feature values into their _RunningStats, taking the
+    first alias column that parses. Blank records are skipped; returns the
+    number of flows seen.
+    """
+    flows = 0
+    for row in rows:
+        if not row:
+            continue
+        flows += 1
+
+        n = len(row)
+        for indices, feat_stats in columns:
+            for idx in indices:
+                if idx < n:
+                    value = _parse_float(row[idx])
+                    if value is not None:
+                        feat_stats.add(value)
+                        break
+    return flows
+
+
+def _parse_float(val: Optional[str]) -> Optional[float]:
+    """Return val as a float, or None if it is empty or not numeric."""
+    if not val:
+        return None
+    try:
+        return float(val)
+    except ValueError:
+        return None
 
 
 # ---------- Step 1: PCAP -> CSV via NTLFlowLyzer ----------
 
+def _read_tail(path: Path, max_bytes: int = 4096) -> str:
+    """Last max_bytes of a log file, decoded leniently."""
+    try:
+        with path.open("rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - max_bytes))
+            return f.read().decode(errors="replace")
+    except OSError as e:
+        return f"<could not read {path}: {e}>"
+
+
 def run_ntlflowlyzer_for_pcap(pcap_path: Path, csv_path: Path) -> None:
     """Run NTLFlowLyzer on a single PCAP -> CSV using a JSON config."""
-    CSV_DIR.mkdir(parents=True, exist_ok=True)
-
-    cfg = {
-        "pcap_file_address": str(pcap_path),
-        "output_file_address": str(csv_path),
-        "label": "Unknown",
-        "number_of_threads": 4,
-        "feature_extractor_min_flows": 1,
-        "writer_min_rows": 1,
-        "max_rows_number": 800000,
-    }
+    _ensure_dirs()
+
+    # NTLFlowLyzer writes under a name the CSV scan ignores; the finished file is
+    # renamed into place so the summariser never reads a half-written CSV
+    tmp_csv_path = csv_path.with_name(f"tmp-{csv_path.name}")
+    cfg = dict(
+        _NTL_CONFIG_TEMPLATE,
+        pcap_file_address=str(pcap_path),
+        output_file_address=str(tmp_csv_path),
+    )
 
     cfg_path = csv_path.with_suffix(".json")
-    with cfg_path.open("w") as f:
-        json.dump(cfg, f, indent=2)
-
-    print(f"[worker] Running NTLFlowLyzer for {pcap_path}", flush=True)
-    completed = subprocess.run(
-        [NTL_BIN, "-c", str(cfg_path)],
-        capture_output=True,
-        text=True,
-    )
+    # Only NTLFlowLyzer reads this file, so skip pretty-printing
+    cfg_path.write_text(json.dumps(cfg, separators=(",", ":")))
+
+    # Tool output goes straight to a file instead of through a pipe; it is only
+    # read back (the tail) if the run fails
+    log_path = csv_path.with_suffix(".log")
+    try:
+        print(f"[worker] Running NTLFlowLyzer for {pcap_path}", flush=True)
+        with log_path.open("wb") as log_file:
+            completed = subprocess.run(
+                [NTL_BIN, "-c", str(cfg_path)],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+    finally:
+        try:
+            cfg_path.unlink()
+        except FileNotFoundError:
+            pass
 
     if completed.returncode != 0:
         print(f"[worker] NTLFlowLyzer FAILED (rc={completed.returncode}) for {pcap_path}", flush=True)
-        print(f"[worker] stdout:\n{completed.stdout}", flush=True)
-        print(f"[worker] stderr:\n{completed.stderr}", flush=True)
+        print(f"[worker] output (tail of {log_path}):\n{_read_tail(log_path)}", flush=True)
+        tmp_csv_path.unlink(missing_ok=True)
         raise RuntimeError(f"NTLFlowLyzer error for {pcap_path}")
     else:
+        os.replace(tmp_csv_path, csv_path)
+        log_path.unlink(missing_ok=True)
         print(f"[worker] NTLFlowLyzer OK for {pcap_path}", flush=True)
 
-    try:
-        cfg_path.unlink()
-    except FileNotFoundError:
-        pass
-
 
 def process_pcaps_to_csv() -> None:
     """Find new PCAP files and convert them to CSV if not already processed."""
-    PCAP_DIR.mkdir(parents=True, exist_ok=True)
-    CSV_DIR.mkdir(parents=True, exist_ok=True)
+    _ensure_dirs()
 
-    pcap_files = sorted(PCAP_DIR.glob("window-*.pcap"))
+    pcap_entries = _scan_window_files(PCAP_DIR, ".pcap")
+    # One directory read instead of an exists() per pcap
+    existing_csvs = _scan_window_files(CSV_DIR, ".csv").keys()
     now = datetime.now(timezone.utc)
 
-    print(f"[worker] Found {len(pcap_files)} pcap files", flush=True)
+    print(f"[worker] Found {len(pcap_entries)} pcap files", flush=True)
 
-    for pcap in pcap_files:
-        window_id = pcap.stem  # window-YYYYmmddHHMMSS
-        csv_path = CSV_DIR / f"{window_id}.csv"
+    # Forget ids whose pcap is gone so the set stays bounded
+    _converted_pcaps.intersection_update(pcap_entries)
+
+    pending: List[Tuple[str, Path, Path]] = []
+    for window_id, entry in pcap_entries.items():  # window-YYYYmmddHHMMSS
+        if window_id in _converted_pcaps:
+            continue
 
         # Skip if CSV already exists
-        if csv_path.exists():
+        if window_id in existing_csvs:
+            _converted_pcaps.add(window_id)
             continue
 
+        pcap = Path(entry.path)
+        csv_path = CSV_DIR / f"{window_id}.csv"
+
         # Avoid very fresh files (tcpdump may still be writing)
-        mtime = datetime.fromtimestamp(pcap.stat().st_mtime, tz=timezone.utc)
+        mtime = datetime.fromtimestamp(entry.stat().st_mtime, tz=timezone.utc)
         age_sec = (now - mtime).total_seconds()
         if age_sec < 10:
             continue
 
-        print(f"[worker] Processing new pcap {pcap} -> {csv_path}", flush=True)
-        try:
-            run_ntlflowlyzer_for_pcap(pcap, csv_path)
-        except Exception as e:
-            print(f"[worker] ERROR processing {pcap}: {e}", flush=True)
+        pending.append((window_id, pcap, csv_path))
+
+    if not pending:
+        return
+
+    # Each conversion is a separate NTLFlowLyzer process, so threads are enough
+    _converting.set()
+    try:
+        with ThreadPoolExecutor(max_workers=min(PCAP_WORKERS, len(pending))) as pool:
+            futures = {}
+            for window_id, pcap, csv_path in pending:
+                print(f"[worker] Processing new pcap {pcap} -> {csv_path}", flush=True)
+                futures[pool.submit(run_ntlflowlyzer_for_pcap, pcap, csv_path)] = (window_id, pcap)
+
+            for future in as_completed(futures):
+                window_id, pcap = futures[future]
+                try:
+                    future.result()
+                    _converted_pcaps.add(window_id)
+                    _csv_ready.set()
+                except Exception as e:
+                    print(f"[worker] ERROR processing {pcap}: {e}", flush=True)
+    finally:
+        _converting.clear()
 
 
 # ---------- Step 2: CSV -> metrics (including ML) + summaries ----------
@@ -152,55 +368,55 @@ def summarise_features_and_ml(csv_path: Path):
       benign_flows, attack_flows, unknown_flows, attacks_per_label
     """
     flows_count = 0
-    total_packets = 0
-    total_payload_bytes = 0
-
-    series: Dict[str, List[float]] = {feat: [] for feat in FEATURES_OF_INTEREST}
 
-    benign_flows = 0
-    attack_flows = 0
-    unknown_flows = 0
-    attacks_per_label: Dict[str, int] = {}
+    stats: Dict[str, _RunningStats] = {feat: _RunningStats() for feat in FEATURES_OF_INTEREST}
+    # Traffic totals add int(value) per row, so they get their own integer sums
+    packets_stats = stats["packets_count"] = _CountStats()
+    payload_stats = stats["total_payload_bytes"] = _CountStats()
 
     use_model = model_is_ready()
+    label_counts: Counter = Counter()
 
     with csv_path.open("r") as f:
-        reader = csv.DictReader(f)
-        header = reader.fieldnames or []
+        reader = csv.reader(f)
+        header = next(reader, [])
         print(f"[worker]   CSV header for {csv_path.name}: {header}", flush=True)
-
-        for row in reader:
-            flows_count += 1
-
-            # Aggregate traffic stats
-            pkt_val = _get_numeric_from_row(row, FEATURE_COLUMN_ALIASES["packets_count"])
-            if pkt_val is not None:
-                total_packets += int(pkt_val)
-
-            payload_val = _get_numeric_from_row(row, FEATURE_COLUMN_ALIASES["total_payload_bytes"])
-            if payload_val is not None:
-                total_payload_bytes += int(payload_val)
-
-            for canonical_name in FEATURES_OF_INTEREST:
-                value = _get_numeric_from_row(row, FEATURE_COLUMN_ALIASES[canonical_name])
-                if value is not None:
-                    series[canonical_name].append(value)
-
-            # ML classification per flow
-            if use_model:
-                label = classify_row(row)
-                if label is None:
-                    continue
-                if label == "Benign":
-                    benign_flows += 1
-                elif label == "Unknown":
-                    unknown_flows += 1
-                    attacks_per_label["Unknown"] = attacks_per_label.get("Unknown", 0) + 1
-                else:
-                    attack_flows += 1
-                    attacks_per_label[label] = attacks_per_label.get(label, 0) + 1
-
-    if not use_model:
+        # The header is fixed per file, so pick each feature's column once
+        columns = [(indices, stats[feat]) for feat, indices in _resolve_feature_columns(header).items()]
+
+        # Decide once which loop to run instead of checking use_model per row
+        if use_model:
+            # Read ML_BATCH_SIZE records at a time: stats for each, then one model call
+            ml_indices = feature_indices(header)
+            while True:
+                batch = list(islice(reader, ML_BATCH_SIZE))
+                if not batch:
+                    break
+                batch_flows = _accumulate_stats(batch, columns)
+                if batch_flows != len(batch):
+                    batch = [row for row in batch if row]
+                flows_count += batch_flows
+
+                # Checked per batch: share the CPU only while conversions are running
+                n_jobs = ML_N_JOBS_WHILE_CONVERTING if _converting.is_set() else -1
+                labels = classify_records(batch, ml_indices, n_jobs)
+                if labels is not None:
+                    label_counts.update(labels)
+        else:
+            flows_count = _accumulate_stats(reader, columns)
+
+    # packets_count / total_payload_bytes are tracked features, so the traffic
+    # totals come straight from their per-row integer sums
+    total_packets = packets_stats.int_total
+    total_payload_bytes = payload_stats.int_total
+
+    if use_model:
+        benign_flows = label_counts.pop("Benign", 0)
+        unknown_flows = label_counts.get("Unknown", 0)
+        # Everything left is an attack class, plus 'Unknown' for review
+        attack_flows = sum(label_counts.values()) - unknown_flows
+        attacks_per_label = dict(label_counts)
+    else:
         # fall back: treat everything as benign if model not available
         benign_flows = flows_count
         attack_flows = 0
@@ -208,13 +424,10 @@ def summarise_features_and_ml(csv_path: Path):
         attacks_per_label = {}
 
     feature_stats: Dict[str, FeatureStats] = {}
-    for feat, values in series.items():
-        if not values:
+    for feat, agg in stats.items():
+        if not agg.count:
             continue
-        mean_v = sum(values) / len(values)
-        min_v = min(values)
-        max_v = max(values)
-        feature_stats[feat] = FeatureStats(mean=mean_v, min=min_v, max=max_v)
+        feature_stats[feat] = FeatureStats(mean=agg.total / agg.count, min=agg.min, max=agg.max)
 
     return (
         flows_count,
@@ -389,37 +602,82 @@ def build_rule_based_summary(window_id: str, metrics: WindowMetrics) -> str:
     return "\n".join(lines)
 
 
+def _llm_cache_key(metrics: WindowMetrics) -> str:
+    # Prompt and options are part of the key so changing either regenerates summaries
+    data = json.dumps(
+        [OLLAMA_MODEL, PROMPT_TEMPLATE, OLLAMA_OPTIONS, asdict(metrics)],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _get_llm_cache() -> OrderedDict:
+    """Load LLM_CACHE_PATH on first use; a missing or corrupt file starts empty."""
+    global _llm_cache
+    if _llm_cache is None:
+        try:
+            _llm_cache = OrderedDict(json.loads(LLM_CACHE_PATH.read_text()))
+        except (OSError, ValueError):
+            _llm_cache = OrderedDict()
+    return _llm_cache
+
+
+def _store_llm_summary(key: str, summary: str) -> None:
+    cache = _get_llm_cache()
+    cache[key] = summary
+    cache.move_to_end(key)
+    while len(cache) > LLM_CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+
+    tmp_path = LLM_CACHE_PATH.with_suffix(".tmp")
+    try:
+        tmp_path.write_text(json.dumps(cache))
+        os.replace(tmp_path, LLM_CACHE_PATH)
+    except OSError as e:
+        print(f"[worker] Failed to write LLM cache {LLM_CACHE_PATH}: {e}", flush=True)
+
+
 def generate_llm_summary(window_id: str, metrics: WindowMetrics) -> str:
     """
     1) Build rule-based behavioural + ML summary.
     2) Ask LLM to rewrite it as clean bullet points.
     3) If LLM fails or misbehaves, fall back to rule-based text.
     """
+    cache_key = _llm_cache_key(metrics)
+    cached = _get_llm_cache().get(cache_key)
+    if cached is not None:
+        print(f"[worker] Reusing cached LLM summary for {window_id}", flush=True)
+        return cached
+
     base_summary = build_rule_based_summary(window_id, metrics)
 
     payload = {
         "model": OLLAMA_MODEL,
-        "prompt": (
-            "You are a senior network security engineer writing notes for an internal monitoring dashboard.\n"
-            "Below is a draft summary describing one 5-minute window of network traffic:\n\n"
-            f"{base_summary}\n\n"
-            "Rewrite this as 3–5 concise bullet points in a professional tone.\n"
-            "IMPORTANT FORMAT RULES:\n"
-            "- Output ONLY bullet points, nothing else.\n"
-            "- Each bullet point MUST start with '- ' (dash + space).\n"
-            "- Do NOT add titles, headings, section labels, or explanations.\n"
-            "- Do NOT mention 'draft', 'rewrite', 'bullet points', or anything about the process.\n"
-            "- Do NOT wrap the answer in quotes, backticks, or code fences.\n"
-            "Just return the final bullet points."
-        ),
-        "stream": False,
+        "prompt": PROMPT_TEMPLATE.format(summary=base_summary),
+        "stream": True,
+        "options": OLLAMA_OPTIONS,
     }
 
     try:
-        resp = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
-        raw = (data.get("response") or "").strip()
+        # Ollama streams one JSON object per line; stop reading at "done"
+        parts = []
+        deadline = time.monotonic() + OLLAMA_TIMEOUT_SECONDS
+        with _ollama_session.post(OLLAMA_URL, json=payload, stream=True, timeout=OLLAMA_TIMEOUT_SECONDS) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                # Leaving the with block closes the response
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"no complete response after {OLLAMA_TIMEOUT_SECONDS}s")
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                parts.append(chunk.get("response") or "")
+                if chunk.get("done"):
+                    break
+        raw = "".join(parts).strip()
         if not raw:
             print(f"[worker] LLM returned empty text for {window_id}, falling back to rule-based summary.", flush=True)
             return base_summary
@@ -434,6 +692,8 @@ def generate_llm_summary(window_id: str, metrics: WindowMetrics) -> str:
         cleaned = raw
 #        print(f"[worker] LLM summary generated for {window_id}: {cleaned[:80]}...", flush=True)
         print(f"[worker] LLM summary generated for {window_id}: {raw}...", flush=True)
+        # Only real LLM output is cached; fallbacks are retried next time
+        _store_llm_summary(cache_key, cleaned)
         return cleaned
 
     except Exception as e:
@@ -449,105 +709,159 @@ def prune_files_by_windows(windows: List[Window]) -> None:
     deleted_pcap = 0
     deleted_csv = 0
 
-    for pcap in PCAP_DIR.glob("window-*.pcap"):
-        if pcap.stem not in keep_ids:
+    for window_id, entry in _scan_window_files(PCAP_DIR, ".pcap").items():
+        if window_id not in keep_ids:
             try:
-                pcap.unlink()
+                os.unlink(entry.path)
                 deleted_pcap += 1
             except Exception as e:
-                print(f"[worker] Failed to delete pcap {pcap}: {e}", flush=True)
+                print(f"[worker] Failed to delete pcap {entry.path}: {e}", flush=True)
 
-    for csv_file in CSV_DIR.glob("window-*.csv"):
-        if csv_file.stem not in keep_ids:
+    for window_id, entry in _scan_window_files(CSV_DIR, ".csv").items():
+        if window_id not in keep_ids:
             try:
-                csv_file.unlink()
+                os.unlink(entry.path)
                 deleted_csv += 1
             except Exception as e:
-                print(f"[worker] Failed to delete csv {csv_file}: {e}", flush=True)
+                print(f"[worker] Failed to delete csv {entry.path}: {e}", flush=True)
+
+    # .done markers, and NTLFlowLyzer logs kept from failed conversions
+    for suffix in (".done", ".log"):
+        for window_id, entry in _scan_window_files(CSV_DIR, suffix).items():
+            if window_id not in keep_ids:
+                try:
+                    os.unlink(entry.path)
+                except Exception as e:
+                    print(f"[worker] Failed to delete {entry.path}: {e}", flush=True)
 
     if deleted_pcap or deleted_csv:
         print(f"[worker] Pruned {deleted_pcap} pcaps and {deleted_csv} csv files", flush=True)
 
 
+def _mark_csvs_done(window_ids: List[str]) -> None:
+    """Drop an empty <window>.done marker next to each summarised CSV."""
+    for window_id in window_ids:
+        marker = CSV_DIR / f"{window_id}.done"
+        try:
+            marker.touch()
+        except OSError as e:
+            print(f"[worker] Failed to write marker {marker}: {e}", flush=True)
+
+
 def process_csvs_to_windows() -> None:
     """
     Convert CSVs into Window objects with metrics + ML + LLM summary,
     save them to /var/netmon/windows.json,
     and prune old PCAP/CSV files.
     """
-    CSV_DIR.mkdir(parents=True, exist_ok=True)
+    _ensure_dirs()
 
     windows = load_windows()
     processed_ids = {w.id for w in windows}
 
-    csv_files = sorted(CSV_DIR.glob("window-*.csv"))
-    print(f"[worker] Found {len(csv_files)} csv files", flush=True)
+    csv_entries = _scan_window_files(CSV_DIR, ".csv")
+    print(f"[worker] Found {len(csv_entries)} csv files", flush=True)
+
+    # .done markers carry the same information across worker restarts
+    done_ids = _scan_window_files(CSV_DIR, ".done").keys()
+    _summarised_csvs.intersection_update(csv_entries)
+    summarised_now: List[str] = []
+
+    pending: List[Tuple[str, WindowMetrics, Future]] = []
+    # One LLM thread: Ollama calls run while the next CSV is being summarised,
+    # but still reach Ollama one at a time
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm") as llm_pool:
+        for window_id, entry in csv_entries.items():
+            # Also skips windows already rotated out of windows.json (and empty
+            # CSVs), which would otherwise be re-summarised every cycle
+            if window_id in processed_ids or window_id in _summarised_csvs or window_id in done_ids:
+                continue
 
-    for csv_path in csv_files:
-        window_id = csv_path.stem
-        if window_id in processed_ids:
-            continue
+            csv_path = Path(entry.path)
+            print(f"[worker] Summarising {csv_path}", flush=True)
+            (
+                flows_count,
+                total_packets,
+                total_payload_bytes,
+                feature_stats,
+                benign_flows,
+                attack_flows,
+                unknown_flows,
+                attacks_per_label,
+            ) = summarise_features_and_ml(csv_path)
+            summarised_now.append(window_id)
+
+            if flows_count == 0:
+                print(f"[worker]   -> no flows in {csv_path}, skipping", flush=True)
+                continue
 
-        print(f"[worker] Summarising {csv_path}", flush=True)
-        (
-            flows_count,
-            total_packets,
-            total_payload_bytes,
-            feature_stats,
-            benign_flows,
-            attack_flows,
-            unknown_flows,
-            attacks_per_label,
-        ) = summarise_features_and_ml(csv_path)
-
-        if flows_count == 0:
-            print(f"[worker]   -> no flows in {csv_path}, skipping", flush=True)
-            continue
+            start_time, end_time = parse_window_times(window_id)
+
+            metrics = WindowMetrics(
+                start_time=start_time,
+                end_time=end_time,
+                total_flows=flows_count,
+                total_packets=total_packets,
+                benign_flows=benign_flows,
+                attack_flows=attack_flows,
+                unknown_flows=unknown_flows,
+                attacks_per_label=attacks_per_label,
+                total_payload_bytes=total_payload_bytes,
+                feature_stats=feature_stats,
+            )
 
-        start_time, end_time = parse_window_times(window_id)
-
-        metrics = WindowMetrics(
-            start_time=start_time,
-            end_time=end_time,
-            total_flows=flows_count,
-            total_packets=total_packets,
-            benign_flows=benign_flows,
-            attack_flows=attack_flows,
-            unknown_flows=unknown_flows,
-            attacks_per_label=attacks_per_label,
-            total_payload_bytes=total_payload_bytes,
-            feature_stats=feature_stats,
-        )
+            # Ask the LLM in the background and move on to the next CSV
+            pending.append((window_id, metrics, llm_pool.submit(generate_llm_summary, window_id, metrics)))
 
-        llm_summary = generate_llm_summary(window_id, metrics)
-        window = Window(id=window_id, metrics=metrics, llm_summary=llm_summary)
-        windows.append(window)
+        for window_id, metrics, llm_future in pending:
+            window = Window(id=window_id, metrics=metrics, llm_summary=llm_future.result())
+            windows.append(window)
 
     # Keep only the last MAX_WINDOWS windows
     windows.sort(key=lambda w: w.metrics.start_time)
-    if len(windows) > MAX_WINDOWS:
+    trimmed = len(windows) > MAX_WINDOWS
+    if trimmed:
         windows = windows[-MAX_WINDOWS:]
 
-    save_windows(windows)
-    print(f"[worker] Saved {len(windows)} windows to /var/netmon/windows.json", flush=True)
+    # Rewriting an unchanged list would still bump windows.json's mtime,
+    # which invalidates the API caches and ETags every cycle
+    if pending or trimmed:
+        save_windows(windows)
+        print(f"[worker] Saved {len(windows)} windows to /var/netmon/windows.json", flush=True)
+
+    # Only after the save, so a failure before it means the CSVs are redone
+    _summarised_csvs.update(summarised_now)
+    _mark_csvs_done(summarised_now)
 
 #    prune_files_by_windows(windows)
 
 
-def main_loop() -> None:
-    print("[worker] Starting combined PCAP->CSV and CSV->windows loop", flush=True)
+def _pcap_loop() -> None:
     while True:
         try:
             process_pcaps_to_csv()
         except Exception as e:
             print(f"[worker] ERROR in process_pcaps_to_csv: {e}", flush=True)
 
+        time.sleep(LOOP_INTERVAL_SECONDS)
+
+
+def main_loop() -> None:
+    print("[worker] Starting combined PCAP->CSV and CSV->windows loop", flush=True)
+
+    # Conversion runs in its own thread so a pcap backlog doesn't hold back
+    # windows for CSVs that are already finished
+    threading.Thread(target=_pcap_loop, name="pcap-to-csv", daemon=True).start()
+
+    while True:
+        _csv_ready.clear()
         try:
             process_csvs_to_windows()
         except Exception as e:
             print(f"[worker] ERROR in process_csvs_to_windows: {e}", flush=True)
 
-        time.sleep(LOOP_INTERVAL_SECONDS)
+        # Returns early as soon as a new CSV is ready
+        _csv_ready.wait(LOOP_INTERVAL_SECONDS)
 
 
 if __name__ == "__main__":
@@ -3,7 +3,6 @@ from datetime import datetime, timezone
 from worker import (
     process_pcaps_to_csv,
     process_csvs_to_windows,
-	#    prune_old_files,
 )
 
 def main():
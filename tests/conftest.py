@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The app modules import each other as top-level modules (run from app/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import main  # noqa: E402
+import storage  # noqa: E402
+
+
+@pytest.fixture
+def windows_path(tmp_path, monkeypatch):
+    """Point storage and the API at a temporary windows.json with a cold cache."""
+    path = tmp_path / "windows.json"
+    monkeypatch.setattr(storage, "WINDOWS_PATH", path)
+    monkeypatch.setattr(main, "WINDOWS_PATH", path)
+    for key in main._cache:
+        monkeypatch.setitem(main._cache, key, None)
+    return path
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from storage import FeatureStats, Window, WindowMetrics, save_windows
+
+
+def _window(minute: int, stats=None) -> Window:
+    start = datetime(2025, 1, 1, 0, minute, tzinfo=timezone.utc)
+    metrics = WindowMetrics(
+        start_time=start,
+        end_time=start.replace(minute=minute + 5),
+        total_flows=4,
+        total_packets=10,
+        benign_flows=3,
+        attack_flows=1,
+        attacks_per_label={"DoS": 1},
+        total_payload_bytes=100,
+        feature_stats=stats or {"duration": FeatureStats(mean=1.0, min=0.0, max=2.0)},
+    )
+    return Window(id=f"window-20250101{minute:02d}0000", metrics=metrics, llm_summary="ok")
+
+
+def test_nan_feature_stat_is_not_served_as_json(windows_path):
+    save_windows([_window(0, {"duration": FeatureStats(mean=float("nan"), min=0.0, max=float("inf"))})])
+    client = TestClient(main.app)
+    with pytest.raises(ValueError):
+        client.get("/api/windows")
+
+
+@pytest.fixture
+def client(windows_path):
+    save_windows([_window(0), _window(5)])
+    return TestClient(main.app)
+
+
+def test_if_none_match_exact(client):
+    etag = client.get("/api/windows").headers["etag"]
+    assert client.get("/api/windows", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_none_match_weakened_by_proxy(client):
+    etag = client.get("/api/windows/latest").headers["etag"]
+    assert not etag.startswith("W/")
+    resp = client.get("/api/windows/latest", headers={"If-None-Match": "W/" + etag})
+    assert resp.status_code == 304
+
+
+def test_if_none_match_list(client):
+    etag = client.get("/api/summary").headers["etag"]
+    resp = client.get("/api/summary", headers={"If-None-Match": '"stale", ' + etag})
+    assert resp.status_code == 304
+    resp = client.get("/api/summary", headers={"If-None-Match": '"stale", W/"other"'})
+    assert resp.status_code == 200
+
+
+def test_if_none_match_star(client):
+    assert client.get("/api/dashboard", headers={"If-None-Match": "*"}).status_code == 304